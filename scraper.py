@@ -1,9 +1,12 @@
 import asyncio
 import csv
 import os
+import re
 from datetime import datetime
 import zoneinfo # To fix the timestamp issue
-from playwright.async_api import async_playwright
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 
 # --- CONFIGURATION ---
 # Add your local timezone here (e.g., "America/Los_Angeles", "Europe/London", etc.)
@@ -17,133 +20,313 @@ REGIONS = [
 ]
 TOTAL_PLAYERS = 300 
 
+# CSV columns, in the order parse_row() returns them
+HEADERS = ("Rank", "Name", "World", "Credits", "Victories", "Credits Gained", "Victories Gained")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/114.0.0.0 Safari/537.36"
+)
+
+# Playwright tracing for the browser fallback is off unless PW_TRACE is set
+# (written to trace.zip). PW_TRACE=1 records DOM snapshots only; PW_TRACE=full adds screenshots and sources.
+TRACE_MODE = os.environ.get("PW_TRACE", "")
+TRACE_ENABLED = bool(TRACE_MODE)
+
+_WS = re.compile(r"\s+")
+
 def clean_text(text: str) -> str:
-    """Your original cleaning logic."""
-    return " ".join(text.split())
+    """Collapse runs of whitespace (newlines from innerText included) to single spaces."""
+    return _WS.sub(" ", text).strip()
 
-async def scrape():
-    async with async_playwright() as p:
-        # Launch Firefox headless (Your original setup)
-        browser = await p.firefox.launch(headless=True)
-        context = await browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/114.0.0.0 Safari/537.36"
-            ),
-            viewport={"width": 1280, "height": 800},
-        )
+def parse_row(rank: str, name: str, world, points_text: str, wins_text: str) -> tuple:
+    """Turn the raw text of one ranking row into a CSV record."""
+    rank = clean_text(rank)
+    name = clean_text(name)
+
+    if world is None:
+        # No separate world element: ".name" reads "First Last World [DC]"
+        parts = name.split()
+        name = " ".join(parts[:2])
+        world = " ".join(parts[2:])
+    else:
+        world = clean_text(world)
+
+    # Credits & Gained ("2614 +190"; clean_text leaves single spaces)
+    credits, _, credits_gained = clean_text(points_text).partition(" ")
+    credits_gained = credits_gained.lstrip("+ ").partition(" ")[0] or "0"
+
+    # Victories & Gained
+    victories, _, victories_gained = clean_text(wins_text).partition(" ")
+    victories_gained = victories_gained.lstrip("+ ").partition(" ")[0] or "0"
+
+    return (rank, name, world, credits, victories, credits_gained, victories_gained)
+
+async def fetch_rows_http(client: httpx.AsyncClient, url: str):
+    """Read the ranking table straight from the served HTML, page by page.
+
+    Returns None when Lodestone answers with something other than the
+    ranking (challenge page, error status, or an empty first page because
+    the rows are only added by JavaScript), so the caller can fall back to
+    the browser. Rankings shorter than TOTAL_PLAYERS are returned as-is.
+    """
+    rows = []
+    page_num = 1
+    while len(rows) < TOTAL_PLAYERS:
+        try:
+            # copy_merge_params keeps ?dcgroup=...; params= would replace the query
+            resp = await client.get(httpx.URL(url).copy_merge_params({"page": page_num}))
+        except httpx.HTTPError:
+            return None
+        if resp.status_code != 200:
+            return None
+
+        tree = LexborHTMLParser(resp.text)
+        if tree.css_first(".cc-ranking__table") is None:
+            return None
+
+        page_rows = []
+        for node in tree.css(".cc-ranking__table > div"):
+            rank, name_cell, points, wins = (node.css_first(sel) for sel in (".order", ".name", ".points", ".wins"))
+            if None in (rank, name_cell, points, wins):
+                continue
+            name = name_cell.css_first(".entry__name") or name_cell
+            world = name_cell.css_first(".entry__world")
+            page_rows.append((
+                rank.text(separator=" "),
+                name.text(separator=" "),
+                world.text(separator=" ") if world is not None else None,
+                points.text(separator=" "),
+                wins.text(separator=" "),
+            ))
+
+        # Stop once the site runs out of pages (or ignores the page param)
+        if not page_rows or page_rows[0] in rows:
+            break
+        rows.extend(page_rows)
+        page_num += 1
+
+    # No rows at all on the first page means they are rendered client-side
+    if not rows:
+        return None
+    return rows[:TOTAL_PLAYERS]
+
+# The browser only needs the page's HTML and its own scripts to build the
+# table; everything else is downloaded just to be thrown away
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "twitter.com",
+)
+
+async def block_unneeded(route) -> None:
+    """Abort requests the ranking table doesn't depend on."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Browser profile kept between runs so the accepted cookie prompt survives.
+# Routing (block_unneeded) turns Playwright's HTTP cache off, so assets are
+# not reused from it
+PROFILE_DIR = ".pw-profile"
 
-        # Loop through each region
-        for region in REGIONS:
-            url = region["url"]
-            folder = region["folder"]
-            
-            print(f"🚀 Scraping: {url}")
-            os.makedirs(folder, exist_ok=True)
-
-            page = await context.new_page()
-            await page.goto(url)
-            await page.wait_for_timeout(2000)
-
-            # --- YOUR ORIGINAL LOGIC STARTS HERE ---
-            
-            # Handle cookie prompt
+# Shared across scrape() calls so Firefox only starts once per process
+_playwright = None
+_context = None
+_context_lock = asyncio.Lock()  # Regions run concurrently; only one may launch it
+
+async def get_context():
+    """Launch Firefox on the persistent profile on first use and reuse it afterwards."""
+    global _playwright, _context
+    async with _context_lock:
+        if _context is None:
+            _playwright = await async_playwright().start()
             try:
-                accept_btn = page.locator("button:has-text('Accept')")
-                if await accept_btn.count() > 0:
-                    await accept_btn.click()
-                    await page.wait_for_timeout(500)
-            except:
-                pass
+                # Launch Firefox headless (Your original setup)
+                _context = await _playwright.firefox.launch_persistent_context(
+                    PROFILE_DIR,
+                    headless=True,
+                    user_agent=USER_AGENT,
+                    viewport={"width": 1280, "height": 800},
+                )
+            except BaseException:
+                # Don't leave the driver running if Firefox never came up
+                await _playwright.stop()
+                _playwright = None
+                raise
+            await _context.route("**/*", block_unneeded)
+            if TRACE_ENABLED:
+                full = TRACE_MODE == "full"
+                await _context.tracing.start(screenshots=full, snapshots=True, sources=full)
+    return _context
+
+async def close_browser() -> None:
+    """Shut down the shared browser, if one was ever launched."""
+    global _playwright, _context
+    if _context is not None:
+        if TRACE_ENABLED:
+            await _context.tracing.stop(path="trace.zip")
+        await _context.close()
+        _context = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
+
+async def fetch_rows_browser(context, url: str):
+    """Render the ranking in Playwright and read every row (slow path)."""
+    # The profile allows only one context, so each region gets its own page in it
+    page = await context.new_page()
+    try:
+        return await read_ranking_page(page, url)
+    finally:
+        await page.close()
 
-            # Wait for the table container
+async def read_ranking_page(page, url: str):
+    """Load the ranking, scroll until it is complete and return the raw rows."""
+    # Wait once for the first row (which implies the table). A failed region
+    # is reported by save_rows() and the next scheduled run picks it up again
+    try:
+        await page.goto(url, wait_until="domcontentloaded", timeout=20000)
+        await page.evaluate("window.scrollBy(0, 100);")
+        await page.wait_for_selector(".cc-ranking__table > div", state="attached", timeout=20000)
+    except PlaywrightError:
+        return []
+
+    # Handle cookie prompt
+    try:
+        accept_btn = page.locator("button:has-text('Accept')")
+        if await accept_btn.count() > 0:
+            await accept_btn.click()
+    except:
+        pass
+
+    # Jump to the bottom so lazy loading fetches everything it can in one go,
+    # and move on as soon as new rows render instead of sleeping. Scrolling
+    # and counting share one evaluate so each step is a single round-trip.
+    scroll_and_count = """
+    () => {
+        window.scrollTo(0, document.body.scrollHeight);
+        return document.querySelectorAll('.cc-ranking__table > div').length;
+    }
+    """
+    curr_rows = await page.evaluate(scroll_and_count)
+    show_more = page.locator("button:has-text('Show More')")
+    show_more_clicked = False
+    show_more_gone = False  # Only latched after it was clicked and then went away
+    scroll_attempt = 0
+    while curr_rows < TOTAL_PLAYERS and scroll_attempt < 50:
+        if not show_more_gone:
             try:
-                await page.wait_for_selector(".cc-ranking__table", timeout=45000)
-                await page.evaluate("window.scrollBy(0, 100);")
-                await page.wait_for_function("""
-                () => document.querySelectorAll('.cc-ranking__table > div').length > 0
-                """, timeout=45000)
+                if await show_more.count() > 0:
+                    await show_more.first.click()
+                    show_more_clicked = True
+                elif show_more_clicked:
+                    show_more_gone = True
             except:
-                print(f"⚠️ Table not found for {folder}. Skipping.")
-                await page.close()
-                continue
+                pass
+
+        try:
+            await page.wait_for_function(
+                "prev => document.querySelectorAll('.cc-ranking__table > div').length > prev",
+                arg=curr_rows,
+                timeout=3000,
+            )
+        except PlaywrightTimeoutError:
+            # The button can re-render after the new rows do; only stop once
+            # nothing grew and it really isn't there
+            if await show_more.count() == 0:
+                break  # Nothing new rendered, the table is as long as it gets
+            show_more_gone = False
+        curr_rows = await page.evaluate(scroll_and_count)
+        scroll_attempt += 1
+
+    # Read every row in one round-trip instead of four inner_text() calls per row
+    data = await page.evaluate("""
+    () => Array.from(document.querySelectorAll('.cc-ranking__table > div')).map(r => {
+        const text = sel => r.querySelector(sel)?.innerText ?? null;
+        return {
+            rank: text('.order'),
+            name: text('.name .entry__name') ?? text('.name'),
+            world: text('.name .entry__world'),
+            points: text('.points'),
+            wins: text('.wins'),
+        };
+    }).filter(r => r.rank !== null && r.name !== null && r.points !== null && r.wins !== null)
+    """)
+    return [(r["rank"], r["name"], r["world"], r["points"], r["wins"]) for r in data]
+
+def save_rows(folder: str, rows) -> None:
+    """Parse raw rows and write today's CSV for a region."""
+    data = []
+    for row in rows:
+        try:
+            data.append(parse_row(*row))
+        except:
+            continue
+
+    if not data:
+        print(f"⚠️ Table not found for {folder}. Skipping.")
+        return
+
+    # Save CSV with Local Timezone
+    os.makedirs(folder, exist_ok=True)
+    date_str = datetime.now(LOCAL_TZ).strftime("%Y-%m-%d")
+    filename = os.path.join(folder, f"rankings_{date_str}.csv")
+
+    # Write next to the target and swap it in, so a crash never leaves a
+    # half-written CSV behind; the big buffer lets the whole file go out in one flush
+    tmp = filename + ".tmp"
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS)
+            writer.writerows(data)
+        os.replace(tmp, filename)
+    except BaseException:
+        # Don't leave stray .tmp files in the data folders for later runs
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    print(f"✅ Saved {len(data)} players to {filename}")
+
+async def scrape_region(client: httpx.AsyncClient, region: dict) -> None:
+    """Scrape one region over HTTP, falling back to the shared browser."""
+    print(f"🚀 Scraping: {region['url']}")
+    rows = await fetch_rows_http(client, region["url"])
+    if rows is None:
+        print(f"🧱 No ranking in the plain HTML for {region['folder']}, using the browser.")
+        rows = await fetch_rows_browser(await get_context(), region["url"])
+    save_rows(region["folder"], rows)
+
+async def scrape():
+    async with httpx.AsyncClient(
+        http2=True,
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+        timeout=30,
+    ) as client:
+        # All regions at once; browser fallbacks each get their own page
+        results = await asyncio.gather(
+            *(scrape_region(client, region) for region in REGIONS),
+            return_exceptions=True,
+        )
+
+    # Let every region finish before surfacing a failure from any of them
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
 
-            # Incremental scrolling (Your original loop)
-            scroll_attempt = 0
-            while scroll_attempt < 50:
-                await page.evaluate("window.scrollBy(0, 800);")
-                await page.wait_for_timeout(700)
-
-                try:
-                    show_more = page.locator("button:has-text('Show More')")
-                    if await show_more.count() > 0:
-                        await show_more.click()
-                        await page.wait_for_timeout(500)
-                except:
-                    pass
-
-                curr_rows = await page.locator(".cc-ranking__table > div").count()
-                if curr_rows >= TOTAL_PLAYERS:
-                    break
-                scroll_attempt += 1
-
-            # Scrape all rows (Your original data extraction)
-            rows = await page.locator(".cc-ranking__table > div").all()
-            data = []
-
-            for row in rows:
-                try:
-                    rank = clean_text(await row.locator(".order").inner_text())
-                    full_name = clean_text(await row.locator(".name").inner_text())
-
-                    # Split Name / World
-                    parts = full_name.split()
-                    if len(parts) >= 2:
-                        name = " ".join(parts[:2])
-                        world = " ".join(parts[2:])
-                    else:
-                        name = full_name
-                        world = ""
-
-                    # Credits & Gained
-                    points_text = clean_text(await row.locator(".points").inner_text())
-                    points_parts = points_text.split()
-                    credits = points_parts[0] if len(points_parts) > 0 else ""
-                    credits_gained = points_parts[1].replace("+", "") if len(points_parts) > 1 else "0"
-
-                    # Victories & Gained
-                    wins_text = clean_text(await row.locator(".wins").inner_text())
-                    wins_parts = wins_text.split()
-                    victories = wins_parts[0] if len(wins_parts) > 0 else ""
-                    victories_gained = wins_parts[1].replace("+", "") if len(wins_parts) > 1 else "0"
-
-                    data.append({
-                        "Rank": rank,
-                        "Name": name,
-                        "World": world,
-                        "Credits": credits,
-                        "Victories": victories,
-                        "Credits Gained": credits_gained,
-                        "Victories Gained": victories_gained
-                    })
-                except:
-                    continue
-
-            # Save CSV with Local Timezone
-            date_str = datetime.now(LOCAL_TZ).strftime("%Y-%m-%d")
-            filename = os.path.join(folder, f"rankings_{date_str}.csv")
-
-            if data:
-                with open(filename, "w", newline="", encoding="utf-8") as f:
-                    writer = csv.DictWriter(f, fieldnames=data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(data)
-                print(f"✅ Saved {len(data)} players to {filename}")
-
-            await page.close() # Close page before next region
-
-        await browser.close()
+async def main():
+    try:
+        await scrape()
+    finally:
+        await close_browser()
 
 if __name__ == "__main__":
-    asyncio.run(scrape())
+    asyncio.run(main())
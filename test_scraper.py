@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+import pytest
+
+import scraper
+
+ROW = (
+    '<div><p class="order">{rank}</p>'
+    '<div class="name"><p class="entry__name">Scarlet Rose</p><p class="entry__world">Spriggan [Chaos]</p></div>'
+    '<div class="points"><p>2614</p><p>+190</p></div>'
+    '<div class="wins"><p>172</p><p>+11</p></div></div>'
+)
+PER_PAGE = 50
+
+def ranking_page(page_num: int) -> str:
+    """Serve PER_PAGE rows per page until TOTAL_PLAYERS is reached."""
+    first = (page_num - 1) * PER_PAGE + 1
+    ranks = range(first, min(first + PER_PAGE, scraper.TOTAL_PLAYERS + 1))
+    return '<div class="cc-ranking__table">' + "".join(ROW.format(rank=r) for r in ranks) + "</div>"
+
+def test_fetch_rows_http_keeps_dcgroup_when_paging():
+    seen = []
+
+    def handler(request):
+        seen.append(request.url)
+        return httpx.Response(200, text=ranking_page(int(request.url.params["page"])))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await scraper.fetch_rows_http(client, scraper.REGIONS[1]["url"])
+
+    rows = asyncio.run(run())
+
+    assert len(rows) == scraper.TOTAL_PLAYERS
+    assert seen
+    for url in seen:
+        assert url.params["dcgroup"] == "Light"
+    assert [url.params["page"] for url in seen] == [str(n) for n in range(1, len(seen) + 1)]
+
+def test_fetch_rows_http_returns_short_rankings():
+    def handler(request):
+        page_num = int(request.url.params["page"])
+        # Only the first page is served, well short of TOTAL_PLAYERS
+        if page_num > 1:
+            return httpx.Response(200, text='<div class="cc-ranking__table"></div>')
+        return httpx.Response(200, text=ranking_page(page_num))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await scraper.fetch_rows_http(client, scraper.REGIONS[3]["url"])
+
+    rows = asyncio.run(run())
+
+    assert len(rows) == PER_PAGE
+    assert rows[0][0] == "1"
+
+def test_fetch_rows_http_falls_back_without_a_ranking():
+    def empty(request):
+        return httpx.Response(200, text='<div class="cc-ranking__table"></div>')
+
+    def challenge(request):
+        return httpx.Response(403, text="<html>Just a moment...</html>")
+
+    async def run(transport):
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await scraper.fetch_rows_http(client, scraper.REGIONS[0]["url"])
+
+    assert asyncio.run(run(httpx.MockTransport(empty))) is None
+    assert asyncio.run(run(httpx.MockTransport(challenge))) is None
+
+def test_parse_row_splits_gained_values():
+    assert scraper.parse_row("1", "Scarlet Rose", "Spriggan [Chaos]", "2614 +190", "172\n+11") == (
+        "1", "Scarlet Rose", "Spriggan [Chaos]", "2614", "172", "190", "11",
+    )
+    # Spaced-out sign, extra tokens and missing gains
+    assert scraper.parse_row("2", "A B", None, "2,614 + 190", "5 +3 extra")[3:] == ("2,614", "5", "190", "3")
+    assert scraper.parse_row("3", "A B C [D]", None, "2614", "")[1:] == ("A B", "C [D]", "2614", "", "0", "0")
+
+def test_save_rows_removes_tmp_file_when_replace_fails(tmp_path, monkeypatch):
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(scraper.os, "replace", fail)
+    folder = tmp_path / "scraped_data"
+
+    with pytest.raises(OSError):
+        scraper.save_rows(str(folder), [("1", "Scarlet Rose", "Spriggan [Chaos]", "2614 +190", "172 +11")])
+
+    assert list(folder.iterdir()) == []